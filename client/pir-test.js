@@ -102,13 +102,19 @@ async function run() {
             const res = await fetch(`${BASE}/kpir`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ token, vectors, chunk_index: chunkIndex })
+                body: JSON.stringify({
+                    token,
+                    vectors_b64: Buffer.from(vectors.flat()).toString("base64"),
+                    n_vectors: vectors.length,
+                    n_modules: nModules,
+                    chunk_index: chunkIndex,
+                })
             });
 
             if (!res.ok) throw new Error(`Server error on chunk ${chunkIndex}: ${res.status}`);
 
             const data = await res.json();
-            const recovered = reconstruct(data.responses);
+            const recovered = reconstruct(data.responses_b64.map((r) => Buffer.from(r, "base64")));
             recoveredChunks.push(Buffer.from(recovered));
 
             console.log(`Recovered chunk ${chunkIndex + 1}/${totalChunks}`);
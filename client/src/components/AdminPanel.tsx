@@ -3,7 +3,7 @@ import {
     adminListModules,
     adminUploadModule,
     adminDeleteModule,
-    adminAddQuizQuestion,
+    adminAddQuizQuestions,
     adminDeleteQuizQuestion,
     fetchQuiz,
 } from '../lib/api';
@@ -408,15 +408,24 @@ function QuizTab({ adminKey }: { adminKey: string }) {
         setError('');
         const results: ('idle' | 'ok' | 'err')[] = Array(5).fill('idle');
 
-        for (let i = 0; i < questions.length; i++) {
-            const q = questions[i];
-            if (!q.question.trim() || q.options.some(o => !o.trim())) continue;
+        // Send every filled-in question in one batch — the server saves them
+        // in a single transaction, so they all succeed or all fail together
+        const filled = questions
+            .map((q, i) => ({ q, i }))
+            .filter(({ q }) => q.question.trim() && !q.options.some(o => !o.trim()));
+
+        if (filled.length > 0) {
+            let status: 'ok' | 'err' = 'ok';
             try {
-                await adminAddQuizQuestion(adminKey, selectedModule.id, q.question, q.options, q.correct);
-                results[i] = 'ok';
+                await adminAddQuizQuestions(
+                    adminKey,
+                    selectedModule.id,
+                    filled.map(({ q }) => ({ question: q.question, options: q.options, correct: q.correct })),
+                );
             } catch {
-                results[i] = 'err';
+                status = 'err';
             }
+            for (const { i } of filled) results[i] = status;
             setSaveResults([...results]);
         }
 
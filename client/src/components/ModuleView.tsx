@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'preact/hooks';
 import { getModule, saveModule, saveChunk, getChunk, getDownloadedChunkCount, clearChunks } from '../lib/idb-store';
 import { fetchCatalog, sendKpir } from '../lib/api';
-import { generateVectors, recoverChunk } from '../lib/kpir';
+import { generateVectors, recoverChunk, unpackResponses } from '../lib/kpir';
 import type { Module } from '../types';
 
 interface ModuleViewProps {
@@ -92,17 +92,11 @@ export function ModuleView({ moduleId, sessionToken, onBack, onStartQuiz }: Modu
                 const vectors = generateVectors(targetIndex, nModules);
                 const data = await sendKpir({
                     token: sessionToken,
-                    vectors: [
-                        Array.from(vectors[0]),
-                        Array.from(vectors[1]),
-                        Array.from(vectors[2]),
-                    ],
+                    vectors,
                     chunk_index: chunkIndex,
                 });
 
-                const responses: Uint8Array[] = data.responses.map(
-                    (r: number[]) => new Uint8Array(r)
-                );
+                const responses = unpackResponses(data.responses_b64);
 
                 const recovered = recoverChunk(responses);
                 await saveChunk(String(moduleId), chunkIndex, recovered);
@@ -128,17 +122,25 @@ export function ModuleView({ moduleId, sessionToken, onBack, onStartQuiz }: Modu
             // Trim server-side padding to exact compressed byte count
             const trimmed = full.slice(0, targetModule.compressed_size);
 
-            // Validate compression header before attempting decompression
+            // Route on the compression header — the server writes gzip by
+            // default, or zstd when started with COMPRESSION=zstd
             const isGzip = trimmed[0] === 0x1F && trimmed[1] === 0x8B;
+            const isZstd = trimmed[0] === 0x28 && trimmed[1] === 0xB5
+                && trimmed[2] === 0x2F && trimmed[3] === 0xFD;
 
-            if (!isGzip) {
+            if (!isGzip && !isZstd) {
                 throw new Error(
-                    `Compressed data header invalid. Expected gzip (0x1F 0x8B).`
+                    `Compressed data header invalid. Expected gzip (0x1F 0x8B) or zstd (0x28 0xB5 0x2F 0xFD).`
                 );
             }
 
             // Decompress using native DecompressionStream
-            const ds = new DecompressionStream('gzip');
+            let ds: DecompressionStream;
+            try {
+                ds = new DecompressionStream((isGzip ? 'gzip' : 'zstd') as CompressionFormat);
+            } catch {
+                throw new Error('This browser cannot decompress zstd modules.');
+            }
             const writer = ds.writable.getWriter();
             writer.write(trimmed);
             writer.close();
@@ -4,6 +4,8 @@ const API_BASE = (import.meta as any).env?.VITE_API_URL ?? "http://127.0.0.1:800
 
 import { emitNetEvent } from './events';
 import type { NetEventType } from './events';
+import { packVectors } from './kpir';
+import type { PIRVectors } from './kpir';
 
 /**
  * Instrumented fetch wrapper — measures real request and response byte sizes
@@ -61,10 +63,16 @@ export async function createSession(ghostId: string): Promise<string> {
 
 export async function sendKpir(payload: {
     token: string;
-    vectors: number[][];
+    vectors: PIRVectors;
     chunk_index: number;
 }) {
-    const body = JSON.stringify(payload);
+    const body = JSON.stringify({
+        token: payload.token,
+        vectors_b64: packVectors(payload.vectors),
+        n_vectors: payload.vectors.length,
+        n_modules: payload.vectors[0].length,
+        chunk_index: payload.chunk_index,
+    });
     const res = await apiFetch(
         `${API_BASE}/kpir`,
         { method: 'POST', headers: { 'Content-Type': 'application/json' }, body },
@@ -163,6 +171,24 @@ export async function adminAddQuizQuestion(
     return res.json();
 }
 
+export async function adminAddQuizQuestions(
+    adminKey: string,
+    moduleId: number,
+    questions: { question: string; options: string[]; correct: number }[],
+) {
+    const body = JSON.stringify({ admin_key: adminKey, module_id: moduleId, questions });
+    const res = await apiFetch(
+        `${API_BASE}/admin/quiz/batch`,
+        { method: 'POST', headers: { 'Content-Type': 'application/json' }, body },
+        'Other',
+    );
+    if (!res.ok) {
+        const err = await res.json().catch(() => ({}));
+        throw new Error(err.detail ?? `Quiz save failed: ${res.status}`);
+    }
+    return res.json();
+}
+
 export async function adminDeleteQuizQuestion(adminKey: string, questionId: number) {
     const body = JSON.stringify({ admin_key: adminKey });
     const res = await apiFetch(
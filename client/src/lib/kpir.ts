@@ -33,6 +33,30 @@ export function generateVectors(targetIndex: number, nModules: number): PIRVecto
     return [v0, v1, v2];
 }
 
+/**
+ * Pack the vectors into the /kpir wire format: the rows concatenated
+ * row-major (one byte per Z_256 element), base64-encoded.
+ */
+export function packVectors(vectors: PIRVectors): string {
+    let binary = '';
+    for (const v of vectors) {
+        for (let i = 0; i < v.length; i++) binary += String.fromCharCode(v[i]);
+    }
+    return btoa(binary);
+}
+
+/**
+ * Decode the /kpir response: one base64 string per vector.
+ */
+export function unpackResponses(responsesB64: string[]): Uint8Array[] {
+    return responsesB64.map((b64) => {
+        const binary = atob(b64);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+        return bytes;
+    });
+}
+
 /**
  * Recover the target chunk by summing the three server responses over Z_256.
  */
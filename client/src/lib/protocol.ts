@@ -1,4 +1,4 @@
-import { generateVectors, recoverChunk } from './kpir';
+import { generateVectors, recoverChunk, unpackResponses } from './kpir';
 import { fetchCatalog, sendKpir } from './api';
 
 export async function fetchModule(
@@ -26,18 +26,12 @@ export async function fetchModule(
 
         const data = await sendKpir({
             token: sessionToken,
-            vectors: [
-                Array.from(vectors[0]),
-                Array.from(vectors[1]),
-                Array.from(vectors[2]),
-            ],
+            vectors,
             chunk_index: chunkIndex,
         });
 
-        // Server returns responses as plain number arrays (see pir-test.js and api.ts)
-        const responses: Uint8Array[] = data.responses.map(
-            (r: number[]) => new Uint8Array(r)
-        );
+        // Server returns one base64 string per vector (see pir-test.js and api.ts)
+        const responses = unpackResponses(data.responses_b64);
 
         allChunks.push(recoverChunk(responses));
     }
@@ -0,0 +1,13 @@
+import os
+
+import uvicorn
+
+# python -m app  (from the server/ directory)
+if __name__ == "__main__":
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "10000")),
+        loop="uvloop",
+        http="httptools",
+    )
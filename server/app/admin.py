@@ -1,14 +1,25 @@
 import os
 import shutil
 import pathlib
+import anyio
 from fastapi import UploadFile
 from .config import UPLOAD_DIR, CHUNK_DIR
 from .preprocess import process_module
 from .loader import preload_chunks
 
+# Uploads are streamed to disk in blocks of this size so a large course
+# video never has to sit in memory in one piece.
+UPLOAD_BLOCK_SIZE = 1 << 20  # 1 MiB
+
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+def _save_upload(src, file_path: str) -> None:
+    """Copy the spooled upload to disk UPLOAD_BLOCK_SIZE bytes at a time."""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(src, f, length=UPLOAD_BLOCK_SIZE)
+
+
 async def handle_upload(file: UploadFile, title: str, topic: str, tier: int) -> int:
     """
     Save the uploaded file, process it through the PIR pipeline, and reload
@@ -21,17 +32,17 @@ async def handle_upload(file: UploadFile, title: str, topic: str, tier: int) ->
 
     file_path = os.path.join(UPLOAD_DIR, safe_name)
 
-    contents = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(contents)
+    # Blocking file I/O and the CPU-bound compression below all run in worker
+    # threads so a large upload never stalls the event loop.
+    await anyio.to_thread.run_sync(_save_upload, file.file, file_path)
 
     # process_module now handles DB insertion itself and returns the real id
-    module_id, chunk_count, compressed_size = process_module(
-        file_path, title, topic, tier
+    module_id, chunk_count, compressed_size = await anyio.to_thread.run_sync(
+        process_module, file_path, title, topic, tier
     )
 
     # Reload the chunk cache so the new module is immediately queryable
-    preload_chunks()
+    await anyio.to_thread.run_sync(preload_chunks)
 
     return module_id
 
@@ -1,25 +1,118 @@
 import sqlite3
 import os
 import json
-from .config import DB_PATH
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .config import DB_PATH, WAL_CHECKPOINT_INTERVAL
 
+# One connection per thread, opened lazily and reused for the life of the
+# process.  FastAPI runs sync routes on a small threadpool, so this gives a
+# handful of long-lived handles instead of reopening catalog.db, -wal and
+# -shm on every query.  Connections are in autocommit mode, so no handle
+# ever holds a transaction (or a WAL snapshot) open between calls.
+_local = threading.local()
 
-def _get_conn():
-    """Open a DB connection with foreign-key enforcement enabled."""
-    conn = sqlite3.connect(DB_PATH)
+
+def _connect(readonly: bool = False):
+    """
+    Open a DB connection with the per-connection pragmas applied.
+
+    WAL persists in the file, but synchronous/busy_timeout/foreign_keys reset
+    on every connect.  WAL + synchronous=NORMAL lets readers proceed during
+    upload commits with half the fsyncs; busy_timeout turns writer collisions
+    into a short wait instead of "database is locked".
+
+    readonly opens the file with mode=ro, so SQLite itself rejects any write
+    on the connection.
+    """
+    if readonly:
+        conn = sqlite3.connect(
+            f"{DB_PATH.as_uri()}?mode=ro", uri=True,
+            isolation_level=None, check_same_thread=False,
+        )
+    else:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, check_same_thread=False)
+        # Setting the journal mode is itself a write; the writer's connection
+        # switches the file to WAL and read-only ones just inherit it
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
     conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
+
+
+def _get_conn():
+    """Return this thread's cached read-only connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect(readonly=True)
     return conn
 
 
+# All writes go through one dedicated writer thread that owns the only
+# connection allowed to write data: the per-thread ones from _get_conn() are
+# opened read-only, and the checkpoint thread only checkpoints.  Serializing
+# writes here means writers queue in-process instead of contending for the
+# SQLite write lock (SQLITE_BUSY), while readers keep using their own
+# thread-local connections, which WAL never blocks.
+_write_queue: queue.Queue = queue.Queue()
+
+
+def _writer_loop() -> None:
+    conn = None
+    while True:
+        fn, future = _write_queue.get()
+        if not future.set_running_or_notify_cancel():
+            continue
+        try:
+            if conn is None:
+                conn = _connect()
+                # Only the committing connection ever auto-checkpoints, so
+                # this one pragma decides who pays for checkpoints
+                if WAL_CHECKPOINT_INTERVAL > 0:
+                    conn.execute("PRAGMA wal_autocheckpoint=0")
+                else:
+                    conn.execute("PRAGMA wal_autocheckpoint=1000")
+            future.set_result(fn(conn.cursor()))
+        except Exception as exc:
+            future.set_exception(exc)
+
+
+threading.Thread(target=_writer_loop, name="catalog-writer", daemon=True).start()
+
+
+def _write(fn):
+    """Run fn(cursor) on the writer thread and return its result (or raise)."""
+    future = Future()
+    _write_queue.put((fn, future))
+    return future.result()
+
+
+def _checkpoint_loop() -> None:
+    """Periodically fold the WAL back into the DB without blocking writers."""
+    conn = _connect()
+    while True:
+        time.sleep(WAL_CHECKPOINT_INTERVAL)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except sqlite3.Error:
+            pass  # retried on the next tick
+
+
 def init_db():
     # Use Path.mkdir so we never get a bare empty-string dirname on Windows
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    _write(_create_schema)
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")   # safer concurrent writes
-    conn.execute("PRAGMA foreign_keys=ON")
-    cursor = conn.cursor()
+    if WAL_CHECKPOINT_INTERVAL > 0:
+        threading.Thread(target=_checkpoint_loop, name="catalog-checkpoint", daemon=True).start()
 
+
+def _create_schema(cursor):
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS modules (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -54,32 +147,29 @@ def init_db():
         CREATE INDEX IF NOT EXISTS idx_quizzes_module_id ON quizzes(module_id)
     """)
 
-    conn.commit()
-    conn.close()
+    # Index for get_bucket()'s topic / topic+tier filters
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_modules_topic_tier ON modules(topic, tier)
+    """)
 
 
 def add_module(title: str, topic: str, tier: int, chunk_count: int, compressed_size: int, filename: str) -> int:
     """Insert a module row and return the real AUTOINCREMENT id."""
-    conn = _get_conn()
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        INSERT INTO modules (title, topic, tier, chunk_count, compressed_size, filename)
-        VALUES (?, ?, ?, ?, ?, ?)
-        """,
-        (title, topic, tier, chunk_count, compressed_size, filename)
-    )
+    def insert(cursor):
+        cursor.execute(
+            """
+            INSERT INTO modules (title, topic, tier, chunk_count, compressed_size, filename)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (title, topic, tier, chunk_count, compressed_size, filename)
+        )
+        return cursor.lastrowid
 
-    module_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return module_id
+    return _write(insert)
 
 
 def get_bucket(topic=None, tier=None):
-    conn = _get_conn()
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
 
     query = """
 SELECT id, title, topic, tier, chunk_count, compressed_size, filename
@@ -100,7 +190,6 @@ WHERE 1=1
 
     cursor.execute(query, params)
     rows = cursor.fetchall()
-    conn.close()
 
     return [
         {
@@ -117,41 +206,68 @@ WHERE 1=1
 
 
 def delete_module(module_id: int) -> bool:
-    conn = _get_conn()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM modules WHERE id=?", (module_id,))
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return deleted > 0
+    def delete(cursor):
+        cursor.execute("DELETE FROM modules WHERE id=?", (module_id,))
+        return cursor.rowcount > 0
+
+    return _write(delete)
 
 
 def add_quiz_question(module_id, question, options, correct):
-    conn = _get_conn()
-    cursor = conn.cursor()
+    def insert(cursor):
+        cursor.execute("SELECT id FROM modules WHERE id=?", (module_id,))
+        if not cursor.fetchone():
+            raise ValueError(f"Module {module_id} does not exist")
+
+        cursor.execute(
+            """
+            INSERT INTO quizzes (module_id, question, options, correct)
+            VALUES (?, ?, ?, ?)
+            """,
+            (module_id, question, json.dumps(options), correct)
+        )
+        return cursor.lastrowid
 
-    cursor.execute("SELECT id FROM modules WHERE id=?", (module_id,))
-    if not cursor.fetchone():
-        conn.close()
-        raise ValueError(f"Module {module_id} does not exist")
+    return _write(insert)
 
-    cursor.execute(
-        """
-        INSERT INTO quizzes (module_id, question, options, correct)
-        VALUES (?, ?, ?, ?)
-        """,
-        (module_id, question, json.dumps(options), correct)
-    )
 
-    conn.commit()
-    question_id = cursor.lastrowid
-    conn.close()
-    return question_id
+def add_quiz_questions(module_id, items) -> int:
+    """
+    Insert several (question, options, correct) items for one module.
+
+    All rows go in under a single transaction, so a batch costs one WAL
+    commit instead of one per question, and either every row lands or none
+    do.  Returns the number of questions inserted.
+    """
+    rows = [(module_id, q, json.dumps(o), c) for q, o, c in items]
+
+    def insert(cursor):
+        # IMMEDIATE takes the write lock up front, so another process writing
+        # the DB makes us wait on busy_timeout here rather than fail mid-batch
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT id FROM modules WHERE id=?", (module_id,))
+            if not cursor.fetchone():
+                raise ValueError(f"Module {module_id} does not exist")
+
+            cursor.executemany(
+                """
+                INSERT INTO quizzes (module_id, question, options, correct)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows
+            )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    return _write(insert)
 
 
 def get_quiz(module_id):
-    conn = _get_conn()
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
 
     cursor.execute(
         """
@@ -163,7 +279,6 @@ def get_quiz(module_id):
         (module_id,)
     )
     rows = cursor.fetchall()
-    conn.close()
 
     return [
         {
@@ -177,15 +292,11 @@ def get_quiz(module_id):
 
 
 def delete_quiz_question(question_id):
-    conn = _get_conn()
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM quizzes WHERE id=?", (question_id,))
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
+    def delete(cursor):
+        cursor.execute("DELETE FROM quizzes WHERE id=?", (question_id,))
+        return cursor.rowcount > 0
 
-    return deleted > 0
+    return _write(delete)
 
 def get_placement_quiz(questions_per_module: int = 2) -> list[dict]:
     """
@@ -197,8 +308,7 @@ def get_placement_quiz(questions_per_module: int = 2) -> list[dict]:
     """
     import random
 
-    conn = _get_conn()
-    cursor = conn.cursor()
+    cursor = _get_conn().cursor()
 
     # JOIN ensures we only get questions for modules that still exist
     cursor.execute("""
@@ -225,6 +335,5 @@ def get_placement_quiz(questions_per_module: int = 2) -> list[dict]:
                 "correct": r[3],
             })
 
-    conn.close()
     random.shuffle(result)
     return result
\ No newline at end of file
@@ -1,25 +1,44 @@
 from pathlib import Path
+from typing import Final
 import os
 import warnings
 
 # server/ directory
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Core PIR settings
-CHUNK_SIZE = 4096
-K = 3
+# Core PIR settings — Final so they read as compile-time constants; the Numba
+# kernel in kpir.py freezes CHUNK_SIZE into its loop bounds.
+CHUNK_SIZE: Final[int] = 4096
+K: Final[int] = 3
 
 # Paths
 DATA_DIR = BASE_DIR / "data"
 DB_PATH = DATA_DIR / "catalog.db"
 CHUNK_DIR = DATA_DIR / "chunks"
+# Each module folder holds one file of chunk_count * CHUNK_SIZE bytes, with
+# chunk i at offset i * CHUNK_SIZE (older folders hold one {idx}.bin per chunk)
+MODULE_DATA_FILE = "data.bin"
 UPLOAD_DIR = BASE_DIR / "uploads"
 
 # Session settings — 15 minutes gives enough headroom for large multi-chunk downloads
 SESSION_TTL = 900  # seconds
 
-# Compression — gzip level (1=fast, 9=best)
+# SQLite WAL checkpointing — when > 0, automatic checkpoints on the writer
+# connection are disabled and a background thread runs a PASSIVE checkpoint
+# every this many seconds instead, keeping checkpoint stalls off upload
+# commits.  0 keeps SQLite's default automatic checkpointing (dev setups).
+WAL_CHECKPOINT_INTERVAL = int(os.environ.get("WAL_CHECKPOINT_INTERVAL", "0"))  # seconds
+
+# Compression — "gzip" (default; every browser decodes it natively) or "zstd"
+# (much less CPU per uploaded byte; needs the zstandard package on the server
+# and a browser whose DecompressionStream supports zstd)
+COMPRESSION = os.environ.get("COMPRESSION", "gzip")
+
+# gzip level (1=fast, 9=best)
 GZIP_LEVEL = 6
 
+# zstd level (1=fast, 19=best)
+ZSTD_LEVEL = 3
+
 # Security
 ADMIN_SECRET = os.environ.get("ADMIN_SECRET", "kc")
@@ -1,7 +1,12 @@
-import hashlib
-from .loader import get_chunks
+from .loader import get_hashes
 
 
 def get_chunk_hash(module_id: int, chunk_index: int) -> str:
-    data = get_chunks()[module_id][chunk_index]  # already bytes
-    return hashlib.sha256(data).hexdigest()
\ No newline at end of file
+    # SHA-256 of the zero-padded CHUNK_SIZE row — the same bytes /kpir serves.
+    # Precomputed by preload_chunks, so this is a dict lookup.  Both checks
+    # run against one HASHES snapshot, so a concurrent reload can't remove the
+    # module between them: KeyError = unknown module, IndexError = unknown chunk.
+    module_hashes = get_hashes()[module_id]
+    if not 0 <= chunk_index < len(module_hashes):
+        raise IndexError(chunk_index)
+    return module_hashes[chunk_index]
\ No newline at end of file
@@ -1,17 +1,117 @@
+import threading
+from collections import OrderedDict
+
 import numpy as np
+from . import loader
 from .config import CHUNK_SIZE, K
 
+# numba is pinned in requirements.txt for the fused kernel below.  It stays an
+# optional import so the server still runs where no numba wheel exists (new
+# Python/NumPy releases usually lag): compute() then falls back to a NumPy
+# matmul, with identical results plus a (K, CHUNK_SIZE) uint16 temporary.
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Upper bound on memoized module matrices per engine.  Each entry is
+# n_modules * CHUNK_SIZE bytes, so this caps the cache at a few MB while still
+# covering the chunk indices that concurrent downloads are currently on.
+MATRIX_CACHE_SIZE = 64
+
+
+if numba is not None:
+    # Eager signature: compiled once at import (no first-request JIT latency)
+    # and specialized for C-contiguous operands.  nogil lets concurrent /kpir
+    # requests run the kernel in parallel from their worker threads.
+    @numba.njit(
+        "void(uint16[:, ::1], uint8[:, ::1], uint8[:, ::1])",
+        cache=True,
+        boundscheck=False,
+        nogil=True,
+    )
+    def _gemv_mod256(V, M, out):
+        """
+        out = (V @ M) mod 256 for V:(K, N) uint16, M:(N, CHUNK_SIZE) uint8, out:(K, CHUNK_SIZE) uint8.
+
+        Accumulates straight into a uint16 row (wraps mod 2^16, so the low
+        byte is the mod-256 result) and truncates into `out` in the same pass,
+        with no (K, C) temporary.  The inner loop runs over the contiguous
+        CHUNK_SIZE axis; Numba freezes the global as a literal, so LLVM sees a
+        fixed trip count it can vectorize and unroll.
+        """
+        n_vectors, n_modules = V.shape
+        acc = np.empty(CHUNK_SIZE, dtype=np.uint16)
+        for k in range(n_vectors):
+            acc[:] = 0
+            for n in range(n_modules):
+                v = V[k, n]
+                for c in range(CHUNK_SIZE):
+                    acc[c] += v * M[n, c]
+            for c in range(CHUNK_SIZE):
+                out[k, c] = acc[c]
+else:
+    _gemv_mod256 = None
+
 
 class ByteKpirEngine:
-    def __init__(self, cache: dict[int, dict[int, bytes]]):
-        self.cache = cache
-        self.module_ids = sorted(cache.keys())
-        self.n_modules = len(self.module_ids)
+    def __init__(self, rows: list[np.ndarray]):
+        # rows[i] is the (n_chunks, CHUNK_SIZE) array of the module at PIR
+        # index i, as published by loader.get_chunk_matrix()
+        self.rows = rows
+        self.n_modules = len(rows)
 
         if self.n_modules == 0:
             raise ValueError("No modules loaded in cache")
 
-    def compute(self, vectors: list[list[int]], chunk_idx: int) -> list[bytes]:
+        # Chunk count per row, so _get_matrix can pick out the modules that
+        # reach a given chunk index in one vectorized comparison
+        self._n_chunks = np.array([len(arr) for arr in rows])
+
+        # chunk_idx -> (cols, M), see _get_matrix.  The loader publishes a new
+        # list on reload rather than mutating it, so matrices built from
+        # self.rows stay valid for the lifetime of this engine.
+        self._M_cache: OrderedDict[int, tuple[np.ndarray | None, np.ndarray]] = OrderedDict()
+        self._M_lock = threading.Lock()
+
+    def _get_matrix(self, chunk_idx: int) -> tuple[np.ndarray | None, np.ndarray]:
+        """
+        Return (cols, M) for chunk_idx.
+
+        Modules have different lengths, so some won't have chunk_idx at all.
+        A missing chunk means that module ends before this index and would
+        contribute an all-zero row, i.e. nothing, to the dot product — so it
+        is left out of M entirely rather than stored and multiplied as zeros.
+        M stacks chunk_idx of the remaining modules, shape (len(cols),
+        CHUNK_SIZE), and cols holds their PIR rows; cols is None when every
+        module has the chunk.  The result is still exact: the client recovers
+        the target module's real chunk, and shorter modules don't interfere.
+        """
+        with self._M_lock:
+            entry = self._M_cache.get(chunk_idx)
+            if entry is not None:
+                self._M_cache.move_to_end(chunk_idx)
+                return entry
+
+        if chunk_idx < 0:
+            cols = np.empty(0, dtype=np.intp)
+        else:
+            cols = np.flatnonzero(self._n_chunks > chunk_idx)
+
+        # Every row is copied from the loader's padded array, so M can start
+        # uninitialized instead of paying for a zero-fill pass as well.
+        M = np.empty((len(cols), CHUNK_SIZE), dtype=np.uint8)
+        for i, row in enumerate(cols):
+            M[i] = self.rows[row][chunk_idx]
+
+        entry = (None if len(cols) == self.n_modules else cols), M
+        with self._M_lock:
+            self._M_cache[chunk_idx] = entry
+            if len(self._M_cache) > MATRIX_CACHE_SIZE:
+                self._M_cache.popitem(last=False)
+        return entry
+
+    def compute(self, vectors: np.ndarray | list[list[int]], chunk_idx: int) -> list[memoryview]:
         """
         Each vector v in vectors selects a linear combination of chunks over Z_256.
 
@@ -26,38 +126,85 @@ class ByteKpirEngine:
         if len(vectors) != K:
             raise ValueError(f"Expected {K} vectors, got {len(vectors)}")
 
-        for i, v in enumerate(vectors):
-            if len(v) != self.n_modules:
+        if isinstance(vectors, np.ndarray) and vectors.dtype == np.uint8:
+            # Packed input (the /kpir wire format): every byte is already in
+            # Z_256, so only the shape needs checking.
+            if vectors.shape != (K, self.n_modules):
                 raise ValueError(
-                    f"Vector {i} length {len(v)} != n_modules {self.n_modules}"
+                    f"Vectors shape {vectors.shape} != ({K}, {self.n_modules})"
                 )
-            if any(val < 0 or val > 255 for val in v):
+            V = vectors
+        else:
+            for i, v in enumerate(vectors):
+                if len(v) != self.n_modules:
+                    raise ValueError(
+                        f"Vector {i} length {len(v)} != n_modules {self.n_modules}"
+                    )
+
+            # Range-check all K vectors in one vectorized pass instead of a Python
+            # comparison per element.  Values too large even for int64 are just as
+            # far outside Z_256, so report them the same way.
+            try:
+                V = np.asarray(vectors, dtype=np.int64)  # (K, n_modules)
+            except OverflowError:
+                raise ValueError("Vector contains values outside Z_256") from None
+            out_of_range = ((V < 0) | (V > 255)).any(axis=1)
+            if out_of_range.any():
+                i = int(np.argmax(out_of_range))
                 raise ValueError(f"Vector {i} contains values outside Z_256")
 
-        # Build the module matrix M: shape (n_modules, CHUNK_SIZE)
+        cols, M = self._get_matrix(chunk_idx)
+        if cols is not None:
+            V = V[:, cols]  # only the modules that have this chunk
+
+        # The kernel runs with boundscheck=False over V.shape and CHUNK_SIZE,
+        # so a V/M mismatch would read out of bounds instead of raising.
+        # Check here, once per call, rather than per element.
+        if M.shape != (V.shape[1], CHUNK_SIZE):
+            raise RuntimeError(
+                f"Module matrix shape {M.shape} does not match vectors shape {V.shape}"
+            )
+
+        # Compute V @ M mod 256 for all K vectors in a single matmul, so M is
+        # streamed through the cache once instead of once per vector.
         #
-        # Modules have different lengths, so some won't have chunk_idx at all.
-        # A missing chunk means that module ends before this index — treat it
-        # as all-zeros so it contributes nothing to the dot product.  This is
-        # mathematically correct: the client recovers the target module's real
-        # chunk, and shorter modules simply don't interfere.
-        chunks = []
-        for module_id in self.module_ids:
-            chunk = self.cache[module_id].get(chunk_idx, b'')
-
-            # Pad to CHUNK_SIZE (handles both missing chunks and short last chunks)
-            if len(chunk) < CHUNK_SIZE:
-                chunk = chunk + bytes(CHUNK_SIZE - len(chunk))
-
-            chunks.append(np.frombuffer(chunk, dtype=np.uint8))
-
-        M = np.stack(chunks).astype(np.int32)  # (n_modules, CHUNK_SIZE)
-
-        # For each query vector compute v @ M mod 256
-        responses = []
-        for v in vectors:
-            vec = np.array(v, dtype=np.int32)
-            result = (vec @ M) % 256
-            responses.append(result.astype(np.uint8).tobytes())
-
-        return responses
\ No newline at end of file
+        # uint16 arithmetic wraps mod 2^16, and 256 divides 2^16, so the low
+        # byte of the wrapped accumulator is exactly the mod-256 result.  This
+        # moves half the bytes of an int32 matmul and needs no explicit mod.
+        # (order="C": the column selection above can leave V Fortran-ordered.)
+        V = V.astype(np.uint16, order="C")
+        if _gemv_mod256 is not None:
+            R = np.empty((len(V), CHUNK_SIZE), dtype=np.uint8)
+            _gemv_mod256(V, M, R)
+        else:
+            R = (V @ M).astype(np.uint8)          # uint16 @ uint8 -> uint16
+
+        # R is freshly allocated per call, so handing out zero-copy views of
+        # its rows is safe and skips a CHUNK_SIZE memcpy per response
+        return [memoryview(R[i]) for i in range(len(R))]
+
+
+# Process-wide engine, rebuilt only when the loader publishes a new chunk
+# cache, so its memoized matrices survive across /kpir requests.
+_ENGINE: ByteKpirEngine | None = None
+_ENGINE_GEN = -1
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine() -> ByteKpirEngine | None:
+    """Return the shared engine for the current chunk cache, or None if no modules are loaded."""
+    global _ENGINE, _ENGINE_GEN
+
+    # Read the generation before the chunks: if a reload lands in between we
+    # build from the newer chunks under the older generation, which only
+    # costs one extra rebuild on the next call — never a stale engine.
+    gen = loader.get_generation()
+    if gen == _ENGINE_GEN:
+        return _ENGINE
+
+    with _ENGINE_LOCK:
+        if gen != _ENGINE_GEN:
+            rows = loader.get_chunk_matrix()
+            _ENGINE = ByteKpirEngine(rows) if rows else None
+            _ENGINE_GEN = gen
+        return _ENGINE
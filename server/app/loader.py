@@ -1,66 +1,268 @@
 import os
-import sqlite3
-from .config import CHUNK_DIR, DB_PATH
+import mmap
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .config import CHUNK_DIR, CHUNK_SIZE, MODULE_DATA_FILE
+from .catalog import _get_conn, get_bucket
 
-# module_id (int) -> chunk_index (int) -> raw bytes
-CHUNKS: dict[int, dict[int, bytes]] = {}
+# module_id (int) -> (n_chunks, CHUNK_SIZE) uint8 array, row i = chunk i.
+# Rows are zero-padded so the PIR engine can use them directly.  Modules
+# stored as a data file are read-only mmap views; treat every array as such.
+CHUNKS: dict[int, np.ndarray] = {}
+
+# module_id (int) -> SHA-256 hex digest of each CHUNKS row, computed at load
+HASHES: dict[int, list[str]] = {}
+
+# The same arrays in PIR row order (ascending module_id — the order /catalog
+# lists modules in), so the engine can index rows directly instead of
+# sorting its way through CHUNKS.
+_chunk_matrix: list[np.ndarray] = []
+
+# Held across every scan-and-publish (preload_chunks, drop_module).  Uploads
+# and deletes reload from worker threads, and without it a preload that
+# scanned the disk before a delete could publish after it, bringing the
+# deleted module back; or two uploads could publish an older scan over a
+# newer one.
+_publish_lock = threading.Lock()
+
+# Bumped every time preload_chunks() publishes a new cache, so consumers can
+# tell whether state they derived from CHUNKS (e.g. the PIR engine) is stale.
+_GEN = 0
+
+# (topic, tier) -> (generation, /catalog module list).  An entry is only
+# served while its generation is current, so every reload invalidates the
+# whole cache without any explicit clearing.
+_catalog_cache: dict[tuple[str | None, int | None], tuple[int, list[dict]]] = {}
+
+# Keys come from client query strings; cap how many distinct ones are kept.
+CATALOG_CACHE_SIZE = 256
+
+# Rows hashed per pool task.  One 4 KiB row takes a few microseconds, less
+# than submitting it to the pool costs, so hashing is handed out in slices
+# large enough to amortize that.
+HASH_BATCH = 256
+
+# Legacy per-chunk files are small (<= CHUNK_SIZE), so preload is bound by
+# per-file open/read latency rather than bandwidth; keeping many reads in
+# flight lets the SSD queue work instead of serving them one at a time.
+READ_WORKERS = 32
 
 
 def _get_valid_module_ids() -> set[int]:
     """Return the set of module IDs currently in the database."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        rows = conn.execute("SELECT id FROM modules").fetchall()
-        conn.close()
+        rows = _get_conn().execute("SELECT id FROM modules").fetchall()
         return {row[0] for row in rows}
     except Exception:
         return set()
 
 
-def preload_chunks() -> None:
-    global CHUNKS
-    CHUNKS = {}
+def _read_into(task: tuple[str, np.ndarray]) -> None:
+    """Read a file straight into its (pre-zeroed) buffer — one chunk row or a whole module."""
+    file_path, buf = task
+    view = memoryview(buf).cast("B")
+    with open(file_path, "rb", buffering=0) as f:
+        while view and (n := f.readinto(view)):
+            view = view[n:]
 
-    if not os.path.exists(CHUNK_DIR):
-        return
 
-    valid_ids = _get_valid_module_ids()
+def _hash_rows(rows: np.ndarray) -> list[str]:
+    """SHA-256 hex digest of each row of a slice of a module array."""
+    return [hashlib.sha256(row).hexdigest() for row in rows]
 
-    for module_id_str in os.listdir(CHUNK_DIR):
-        module_path = os.path.join(CHUNK_DIR, module_id_str)
 
-        if not os.path.isdir(module_path):
-            continue
+# Map data files instead of reading them, so chunk bytes live only in the
+# page cache — shared by every worker process — rather than copied into each
+# process's heap.  Not on Windows, where a mapped file cannot be deleted
+# (module removal would fail until the mapping is collected).
+MMAP_CHUNKS = os.name != "nt"
 
-        try:
-            module_id = int(module_id_str)
-        except ValueError:
-            continue
 
-        # Skip stale folders whose DB row no longer exists
-        if module_id not in valid_ids:
-            continue
+def _map_module(data_path: str, n_chunks: int) -> np.ndarray:
+    """Return a read-only (n_chunks, CHUNK_SIZE) view of a data file, backed by the page cache."""
+    with open(data_path, "rb") as f:
+        # The mapping stays valid after the file is closed, and is unmapped
+        # once the last array viewing it is gone
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(mm, dtype=np.uint8).reshape(n_chunks, CHUNK_SIZE)
 
-        CHUNKS[module_id] = {}
 
-        for file in os.listdir(module_path):
-            if not file.endswith(".bin"):
+def _list_chunk_files(module_path: str) -> dict[int, str]:
+    """Map chunk_index -> path for every {idx}.bin file in a module folder."""
+    indices: dict[int, str] = {}
+
+    with os.scandir(module_path) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".bin"):
                 continue
 
             try:
-                chunk_index = int(file[:-4])  # strip ".bin"
+                chunk_index = int(entry.name[:-4])  # strip ".bin"
             except ValueError:
                 continue
 
-            file_path = os.path.join(module_path, file)
+            indices[chunk_index] = entry.path
+
+    return indices
+
 
-            with open(file_path, "rb") as f:
-                CHUNKS[module_id][chunk_index] = f.read()
+def _publish(chunks: dict[int, np.ndarray], hashes: dict[int, list[str]]) -> None:
+    """
+    Swap in a new cache and every view derived from it, then bump _GEN.
+
+    Call with _publish_lock held, for the whole build as well as the publish:
+    that is what keeps a cache built from an older disk or CHUNKS state from
+    landing after a newer one.
+    """
+    global CHUNKS, HASHES, _chunk_matrix, _GEN
+
+    HASHES = hashes
+    _chunk_matrix = [chunks[m] for m in sorted(chunks)]
+    CHUNKS = chunks
+    # Bump only after publishing: a reader that sees the new generation is
+    # then guaranteed to also see the new CHUNKS.
+    _GEN += 1
+
+
+def _scan_chunks() -> tuple[dict[int, np.ndarray], dict[int, list[str]]]:
+    """Load every module folder under CHUNK_DIR and hash its chunks."""
+    if not os.path.exists(CHUNK_DIR):
+        return {}, {}
+
+    valid_ids = _get_valid_module_ids()
+
+    # Build into a local dict and publish it in one assignment, so readers
+    # never observe a half-loaded cache.
+    chunks: dict[int, np.ndarray] = {}
+    reads: list[tuple[str, np.ndarray]] = []
+
+    # scandir hands back the d_type from getdents, so is_dir() needs no
+    # extra stat() per entry the way os.path.isdir() did.
+    with os.scandir(CHUNK_DIR) as module_entries:
+        for module_entry in module_entries:
+            if not module_entry.is_dir():
+                continue
+
+            try:
+                module_id = int(module_entry.name)
+            except ValueError:
+                continue
+
+            # Skip stale folders whose DB row no longer exists
+            if module_id not in valid_ids:
+                continue
+
+            data_path = os.path.join(module_entry.path, MODULE_DATA_FILE)
+            try:
+                data_size = os.stat(data_path).st_size
+            except FileNotFoundError:
+                data_size = None
+
+            if data_size is not None:
+                # One file, chunk i at offset i * CHUNK_SIZE.  process_module
+                # pads it to whole chunks, so it maps straight onto the array;
+                # otherwise a single read fills a zero-padded copy.
+                n_chunks = -(-data_size // CHUNK_SIZE)
+                if MMAP_CHUNKS and data_size and data_size % CHUNK_SIZE == 0:
+                    module_arr = _map_module(data_path, n_chunks)
+                else:
+                    module_arr = np.zeros((n_chunks, CHUNK_SIZE), dtype=np.uint8)
+                    reads.append((data_path, module_arr))
+            else:
+                # Folder written before data files: one {idx}.bin per chunk
+                indices = _list_chunk_files(module_entry.path)
+                n_chunks = max(indices) + 1 if indices else 0
+                module_arr = np.zeros((n_chunks, CHUNK_SIZE), dtype=np.uint8)
+
+                for chunk_index, file_path in indices.items():
+                    reads.append((file_path, module_arr[chunk_index]))
+
+            chunks[module_id] = module_arr
+
+    # Each task writes a distinct buffer, so the reads need no coordination
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+        for _ in executor.map(_read_into, reads):
+            pass
+
+        # Chunks are immutable once loaded, so hash them once here instead of
+        # on every /integrity call.  hashlib releases the GIL while hashing,
+        # so HASH_BATCH-row slices of every module run across the pool.
+        pending = {
+            module_id: [
+                executor.submit(_hash_rows, module_arr[i:i + HASH_BATCH])
+                for i in range(0, len(module_arr), HASH_BATCH)
+            ]
+            for module_id, module_arr in chunks.items()
+        }
+        hashes = {
+            module_id: [h for future in futures for h in future.result()]
+            for module_id, futures in pending.items()
+        }
+
+    return chunks, hashes
+
+
+def preload_chunks() -> None:
+    with _publish_lock:
+        chunks, hashes = _scan_chunks()
+        _publish(chunks, hashes)
 
 
 preload_chunks()
 
 
-def get_chunks() -> dict[int, dict[int, bytes]]:
+def drop_module(module_id: int) -> None:
+    """Publish a cache without module_id, without re-reading the rest from disk."""
+    with _publish_lock:
+        _publish(
+            {m: arr for m, arr in CHUNKS.items() if m != module_id},
+            {m: h for m, h in HASHES.items() if m != module_id},
+        )
+
+
+def get_chunks() -> dict[int, np.ndarray]:
     """Always returns the current CHUNKS dict."""
-    return CHUNKS
\ No newline at end of file
+    return CHUNKS
+
+
+def get_chunk_matrix() -> list[np.ndarray]:
+    """Return the current per-module chunk arrays in PIR row order."""
+    return _chunk_matrix
+
+
+def get_generation() -> int:
+    """Return the current cache generation (see _GEN)."""
+    return _GEN
+
+
+def get_hashes() -> dict[int, list[str]]:
+    """Always returns the current HASHES dict."""
+    return HASHES
+
+
+def get_catalog(topic: str | None = None, tier: int | None = None) -> list[dict] | None:
+    """Return the cached /catalog slice for (topic, tier), or None if it must be rebuilt."""
+    entry = _catalog_cache.get((topic or None, tier or None))
+    if entry is not None and entry[0] == _GEN:
+        return entry[1]
+    return None
+
+
+def build_catalog(topic: str | None = None, tier: int | None = None) -> list[dict]:
+    """
+    Query the modules that are both in the DB and loaded in CHUNKS, and cache them.
+
+    Hits the database, so call it from a worker thread.
+    """
+    # Read the generation before CHUNKS: if a reload lands in between, the
+    # entry is tagged with the older generation and simply rebuilt next time.
+    gen = _GEN
+    chunks = CHUNKS
+    modules = [m for m in get_bucket(topic, tier) if m["id"] in chunks]
+
+    if len(_catalog_cache) >= CATALOG_CACHE_SIZE:
+        _catalog_cache.clear()
+    _catalog_cache[(topic or None, tier or None)] = (gen, modules)
+    return modules
@@ -1,27 +1,32 @@
+import base64
+import binascii
+
+import anyio
+import numpy as np
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
 from pydantic import BaseModel
 
 from .catalog import (
     get_placement_quiz,
     init_db, get_bucket, delete_module,
-    add_quiz_question, get_quiz, delete_quiz_question,
+    add_quiz_question, add_quiz_questions, get_quiz, delete_quiz_question,
 )
 from .session import create_session, validate_session
 from . import loader
 from .admin import handle_upload, delete_module_files
 from .integrity import get_chunk_hash
 from .config import ADMIN_SECRET
-from .kpir import ByteKpirEngine
+from .kpir import get_engine
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
-class TruncateIPMiddleware(BaseHTTPMiddleware):
+class TruncateIPMiddleware:
     """
     Truncates the client IP before it can reach any route handler or logger.
 
@@ -31,26 +36,34 @@ class TruncateIPMiddleware(BaseHTTPMiddleware):
     This is data minimisation, not anonymisation. Render/Vercel edge logs
     still capture the full IP upstream; this only affects what your app sees.
     """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
     @staticmethod
     def _truncate(ip: str) -> str:
+        # find/rfind + one slice rather than split/join: no intermediate
+        # list or per-group strings on every request
         if not ip:
             return ip
         if ":" in ip:
             # IPv6 — keep first 3 groups, blank the rest
-            groups = ip.split(":")
-            return ":".join(groups[:3]) + "::"
-        else:
+            second = ip.find(":", ip.find(":") + 1)
+            third = -1 if second == -1 else ip.find(":", second + 1)
+            return (ip if third == -1 else ip[:third]) + "::"
+        if ip.count(".") == 3:
             # IPv4 — zero out the last octet
-            parts = ip.split(".")
-            if len(parts) == 4:
-                return f"{parts[0]}.{parts[1]}.{parts[2]}.0"
+            return ip[:ip.rfind(".") + 1] + "0"
         return ip
 
-    async def dispatch(self, request: Request, call_next):
-        if request.client:
-            truncated = self._truncate(request.client.host)
-            request.scope["client"] = (truncated, request.client.port)
-        return await call_next(request)
+    # Plain ASGI rather than BaseHTTPMiddleware: the client address is
+    # rewritten in the scope directly, with no Request wrapper or extra task
+    # and body-streaming layer per request.
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            client = scope.get("client")
+            if client:
+                scope["client"] = (self._truncate(client[0]), client[1])
+        await self.app(scope, receive, send)
 
 
 # NOTE: Restrict allow_origins to your frontend domain in production.
@@ -83,8 +96,13 @@ class SessionRequest(BaseModel):
 
 
 class KpirRequest(BaseModel):
+    # Vectors travel packed: n_vectors rows of n_modules bytes each, row-major,
+    # base64-encoded.  Every byte is already an element of Z_256, and Pydantic
+    # only has to check one string instead of coercing n_vectors * n_modules ints.
     token: str
-    vectors: list[list[int]]
+    vectors_b64: str
+    n_vectors: int
+    n_modules: int
     chunk_index: int
 
 
@@ -96,6 +114,18 @@ class QuizQuestionRequest(BaseModel):
     correct: int
 
 
+class QuizQuestionItem(BaseModel):
+    question: str
+    options: list[str]
+    correct: int
+
+
+class QuizBatchRequest(BaseModel):
+    admin_key: str
+    module_id: int
+    questions: list[QuizQuestionItem]
+
+
 class DeleteQuizQuestionRequest(BaseModel):
     admin_key: str
 
@@ -113,64 +143,83 @@ def session(request: SessionRequest):
 
 
 @app.get("/catalog")
-def catalog(request: Request, topic: str = None, tier: int = None):
+async def catalog(topic: str = None, tier: int = None):
     """
     Returns modules that are both in the DB *and* have chunks loaded in memory.
 
     The PIR engine is built from the in-memory chunk cache (loader.get_chunks()).
     If the catalog returned modules without chunks, the client would generate
     vectors of the wrong length and every /kpir call would fail with a 400.
-    Filtering here keeps the two sources of truth permanently in sync.
+    Filtering against the chunk cache keeps the two sources of truth in sync.
     """
-    print(f"Client IP: {request.client.host}")  # will show truncated IP — remove after testing
-    chunks = loader.get_chunks()
-    loaded_ids = set(chunks.keys())
-    all_modules = get_bucket(topic, tier)
-    modules = [m for m in all_modules if m["id"] in loaded_ids]
+    # Served from the loader's cache until the next upload/delete; only a
+    # miss needs the DB query (in a worker thread).
+    modules = loader.get_catalog(topic, tier)
+    if modules is None:
+        modules = await anyio.to_thread.run_sync(loader.build_catalog, topic, tier)
     return {"modules": modules}
 
 
 @app.post("/kpir")
-def kpir(request: KpirRequest):
+async def kpir(request: KpirRequest):
+    # Cheap checks run on the event loop; only the PIR matmul itself is
+    # pushed to a worker thread (the kernel releases the GIL while it runs).
     if not validate_session(request.token):
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
-    if not request.vectors:
+    if request.n_vectors <= 0:
         raise HTTPException(status_code=400, detail="Empty vector set")
 
-    chunks = loader.get_chunks()
-    if not chunks:
+    engine = get_engine()
+    if engine is None:
         raise HTTPException(status_code=503, detail="No modules loaded on server")
 
-    engine = ByteKpirEngine(chunks)
+    n_modules = engine.n_modules
+    if request.n_modules != n_modules:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Vectors have length {request.n_modules} but server has {n_modules} module(s) loaded. "
+                f"Re-fetch /catalog to get the correct module count before building vectors."
+            ),
+        )
 
-    n_modules = len(loader.get_chunks())
-    for i, v in enumerate(request.vectors):
-        if len(v) != n_modules:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"Vector {i} has length {len(v)} but server has {n_modules} module(s) loaded. "
-                    f"Re-fetch /catalog to get the correct module count before building vectors."
-                ),
-            )
+    try:
+        buf = base64.b64decode(request.vectors_b64, validate=True)
+    except (binascii.Error, ValueError):
+        raise HTTPException(status_code=400, detail="vectors_b64 is not valid base64")
+    if len(buf) != request.n_vectors * n_modules:
+        raise HTTPException(
+            status_code=400,
+            detail=f"vectors_b64 holds {len(buf)} bytes, expected n_vectors * n_modules = "
+                   f"{request.n_vectors * n_modules}",
+        )
+    vectors = np.frombuffer(buf, dtype=np.uint8).reshape(request.n_vectors, n_modules)
 
     try:
-        responses = engine.compute(request.vectors, request.chunk_index)
+        responses = await anyio.to_thread.run_sync(
+            engine.compute, vectors, request.chunk_index
+        )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
-    return {"responses": [list(r) for r in responses]}
+    # One base64 string per response instead of a JSON array of ints: ~1.3
+    # bytes on the wire per chunk byte rather than up to 4, and b64encode
+    # reads the memoryviews directly.  Returning the response object skips
+    # jsonable_encoder.
+    return ORJSONResponse(
+        {"responses_b64": [base64.b64encode(r).decode("ascii") for r in responses]}
+    )
 
 
 @app.get("/integrity")
 def integrity(module_id: int, chunk_index: int):
-    chunks = loader.get_chunks()
-    if module_id not in chunks:
+    try:
+        return {"hash": get_chunk_hash(module_id, chunk_index)}
+    except KeyError:
         raise HTTPException(status_code=404, detail="Module not found")
-    if chunk_index not in chunks[module_id]:
+    except IndexError:
         raise HTTPException(status_code=404, detail="Chunk not found")
-    return {"hash": get_chunk_hash(module_id, chunk_index)}
 
 
 @app.get("/quiz/{module_id}")
@@ -225,9 +274,10 @@ def remove_module(module_id: int, request: DeleteModuleRequest):
     if not deleted:
         raise HTTPException(status_code=404, detail="Module not found")
 
-    # Remove chunk files from disk and reload the in-memory cache
+    # Remove chunk files from disk and evict the module from the in-memory
+    # cache — the other modules are unchanged, so there is nothing to re-read
     delete_module_files(module_id)
-    loader.preload_chunks()
+    loader.drop_module(module_id)
 
     return {"status": "deleted", "modules": get_bucket()}
 
@@ -256,6 +306,32 @@ def add_question(request: QuizQuestionRequest):
     return {"status": "created", "question_id": question_id}
 
 
+@app.post("/admin/quiz/batch")
+def add_questions(request: QuizBatchRequest):
+    """Save several questions for one module in a single DB transaction."""
+    if request.admin_key != ADMIN_SECRET:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="Empty question set")
+
+    for i, q in enumerate(request.questions):
+        if len(q.options) < 2:
+            raise HTTPException(status_code=400, detail=f"Question {i}: at least 2 options required")
+        if q.correct < 0 or q.correct >= len(q.options):
+            raise HTTPException(status_code=400, detail=f"Question {i}: correct index out of range")
+
+    try:
+        created = add_quiz_questions(
+            request.module_id,
+            [(q.question, q.options, q.correct) for q in request.questions],
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+    return {"status": "created", "count": created}
+
+
 @app.delete("/admin/quiz/{question_id}")
 def delete_question(question_id: int, request: DeleteQuizQuestionRequest):
     if request.admin_key != ADMIN_SECRET:
@@ -1,43 +1,134 @@
 import os
 import pathlib
 import gzip
-from .config import CHUNK_SIZE, CHUNK_DIR
+import shutil
+import tempfile
+import threading
+from .config import CHUNK_SIZE, CHUNK_DIR, COMPRESSION, GZIP_LEVEL, MODULE_DATA_FILE, ZSTD_LEVEL
 from .catalog import add_module
 
+try:
+    import zstandard
+except ImportError:  # optional — only needed when COMPRESSION = "zstd"
+    zstandard = None
+
+if COMPRESSION not in ("gzip", "zstd"):
+    raise RuntimeError(f"Unknown COMPRESSION {COMPRESSION!r}; expected 'gzip' or 'zstd'")
+if COMPRESSION == "zstd" and zstandard is None:
+    raise RuntimeError("COMPRESSION=zstd requires the zstandard package")
+
+# Source files are fed to the compressor in blocks of this size, so peak
+# memory stays O(CHUNK_SIZE + block) however large the module is.
+READ_BLOCK_SIZE = 64 * 1024
+
+# Compressed output is written to the module's data file in runs of whole
+# chunks, one write() per WRITE_BATCH chunks, so a module costs a handful of
+# syscalls instead of an open/write/close per chunk.
+WRITE_BATCH = 32
+
+# ZstdCompressor setup is amortized across uploads, but an instance must not
+# be shared between threads, so each upload worker thread keeps its own.
+_zstd_local = threading.local()
+
+
+def _compressor(sink):
+    """Open a streaming compressor for the configured COMPRESSION, writing into sink."""
+    if COMPRESSION == "zstd":
+        cctx = getattr(_zstd_local, "cctx", None)
+        if cctx is None:
+            cctx = _zstd_local.cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1)
+        # closefd=False: closing the stream must not close the sink, whose
+        # close() is what writes the final short chunk
+        return cctx.stream_writer(sink, closefd=False)
+    return gzip.GzipFile(fileobj=sink, mode="wb", compresslevel=GZIP_LEVEL)
+
+
+def _write_all(f, data) -> None:
+    """Write every byte of data to the unbuffered file f (raw writes may be partial)."""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
+class _ChunkWriter:
+    """Write-only file-like sink that lays its input out as CHUNK_SIZE rows of one file."""
+
+    def __init__(self, f):
+        self.size = 0
+        self._buf = bytearray()
+        self._f = f
+
+    @property
+    def chunk_count(self) -> int:
+        return -(-self.size // CHUNK_SIZE)
+
+    def write(self, data) -> int:
+        self._buf += data
+        self.size += len(data)
+        if len(self._buf) >= WRITE_BATCH * CHUNK_SIZE:
+            n = len(self._buf) - len(self._buf) % CHUNK_SIZE
+            _write_all(self._f, memoryview(self._buf)[:n])
+            del self._buf[:n]
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        """Write out the rest, zero-padding the final chunk to a full CHUNK_SIZE."""
+        if self._buf:
+            self._buf += bytes(-len(self._buf) % CHUNK_SIZE)
+            _write_all(self._f, self._buf)
+            self._buf.clear()
+        # Drop any preallocated tail beyond the last chunk
+        self._f.truncate(self.chunk_count * CHUNK_SIZE)
+
 
 def process_module(path: str, title: str, topic: str, tier: int) -> tuple[int, int, int]:
     """
     Compress and chunk a module file.
 
-    The DB row is inserted FIRST so we use the real AUTOINCREMENT id as the
-    chunk folder name — eliminating the TOCTOU race condition and any
-    divergence between the filesystem and the database.
+    The file is streamed through the configured compressor into a single
+    zero-padded data file (chunk i at offset i * CHUNK_SIZE) in a staging
+    folder as it compresses.  Only then is the DB row inserted, and the
+    staging folder is renamed to the real AUTOINCREMENT id — so the folder
+    name always matches the database (no TOCTOU race), and a failed upload
+    leaves neither a row nor a half-written module behind.
 
     Returns (module_id, chunk_count, compressed_size).
     """
     safe_filename = pathlib.Path(path).name
 
-    with open(path, "rb") as f:
-        raw = f.read()
-
-    compressed = gzip.compress(raw, compresslevel=6)
-    compressed_size = len(compressed)
+    os.makedirs(CHUNK_DIR, exist_ok=True)
+    # Non-numeric name, so preload_chunks() never picks it up mid-write
+    staging = tempfile.mkdtemp(prefix=".incoming-", dir=CHUNK_DIR)
 
-    chunks = [
-        compressed[i:i + CHUNK_SIZE]
-        for i in range(0, compressed_size, CHUNK_SIZE)
-    ]
-    chunk_count = len(chunks)
+    try:
+        with open(os.path.join(staging, MODULE_DATA_FILE), "wb", buffering=0) as out:
+            # Reserve roughly the final size up front (uploads are mostly
+            # already-compressed media, so output ~= input) so the file is
+            # laid out in a few extents rather than grown write by write.
+            # Purely an optimization — skipped where unsupported.
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(out.fileno(), 0, max(os.path.getsize(path), 1))
+                except OSError:
+                    pass
 
-    # Insert row first — DB assigns the real id
-    module_id = add_module(title, topic, tier, chunk_count, compressed_size, safe_filename)
+            sink = _ChunkWriter(out)
+            with open(path, "rb") as src, _compressor(sink) as comp:
+                while block := src.read(READ_BLOCK_SIZE):
+                    comp.write(block)
+            sink.close()
 
-    # Write chunks under the real DB id
-    module_folder = os.path.join(CHUNK_DIR, str(module_id))
-    os.makedirs(module_folder, exist_ok=True)
+        chunk_count = sink.chunk_count
+        compressed_size = sink.size
 
-    for idx, chunk in enumerate(chunks):
-        with open(os.path.join(module_folder, f"{idx}.bin"), "wb") as f:
-            f.write(chunk)
+        # DB assigns the real id; the chunks then move under it in one rename
+        module_id = add_module(title, topic, tier, chunk_count, compressed_size, safe_filename)
+        os.rename(staging, os.path.join(CHUNK_DIR, str(module_id)))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
 
-    return module_id, chunk_count, compressed_size
\ No newline at end of file
+    return module_id, chunk_count, compressed_size
@@ -1,35 +1,76 @@
+import functools
+import heapq
 import secrets
 import time
 from .config import SESSION_TTL
 
+# Expiry times are time.monotonic() values: immune to wall-clock jumps.
 SESSIONS: dict[str, dict] = {}
 
+# Only slide a session's expiry once less than this much of its TTL remains,
+# so most validations are a pure read instead of a dict write.
+_SLIDE_MARGIN = SESSION_TTL * 0.2
+
+# (expires, token) min-heap.  Holds at most one entry per live session; an
+# entry may be older than the session's real expiry because validation slides
+# the window without touching the heap.
+_expiry_heap: list[tuple[float, str]] = []
+
 
 def _cleanup_expired() -> None:
     """Remove expired sessions to prevent unbounded memory growth."""
-    now = time.time()
-    expired = [tok for tok, s in SESSIONS.items() if now > s["expires"]]
-    for tok in expired:
-        del SESSIONS[tok]
+    now = time.monotonic()
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        _, tok = heapq.heappop(_expiry_heap)
+        session = SESSIONS.get(tok)
+        if session is None:
+            continue  # already removed by _check_session
+        if now > session["expires"]:
+            SESSIONS.pop(tok, None)
+        else:
+            # Expiry slid forward since this entry was pushed — requeue it
+            heapq.heappush(_expiry_heap, (session["expires"], tok))
 
 
 def create_session(ghost_id: str) -> str:
     _cleanup_expired()
     token = secrets.token_hex(32)
+    expires = time.monotonic() + SESSION_TTL
     SESSIONS[token] = {
         "ghost_id": ghost_id,
-        "expires": time.time() + SESSION_TTL,
+        "expires": expires,
     }
+    heapq.heappush(_expiry_heap, (expires, token))
     return token
 
 
 def validate_session(token: str) -> bool:
+    """
+    A PIR download validates the same token once per chunk, so results are
+    memoized per (token, whole second).  The cost is that a session can stay
+    valid for up to one second past its expiry.
+    """
+    return _validate_at(token, int(time.monotonic()))
+
+
+@functools.lru_cache(maxsize=4096)
+def _validate_at(token: str, bucket: int) -> bool:
+    # bucket only keys the cache — entries stop matching as the second rolls over
+    return _check_session(token)
+
+
+def _check_session(token: str) -> bool:
     session = SESSIONS.get(token)
     if not session:
         return False
-    if time.time() > session["expires"]:
-        del SESSIONS[token]
+    now = time.monotonic()
+    expires = session["expires"]
+    if now > expires:
+        # pop, not del: _cleanup_expired (on a threadpool thread) may be
+        # removing the same token at the same moment
+        SESSIONS.pop(token, None)
         return False
-    # Slide the expiry window on each valid use so active downloads don't expire
-    session["expires"] = time.time() + SESSION_TTL
-    return True
\ No newline at end of file
+    # Slide the expiry window as it nears its end so active downloads don't expire
+    if expires - now < _SLIDE_MARGIN:
+        session["expires"] = now + SESSION_TTL
+    return True
@@ -0,0 +1,29 @@
+"""
+Production server config:  gunicorn -c gunicorn_conf.py app.main:app
+
+Run from the server/ directory.  For local development `python -m app`
+starts a single Uvicorn process with the same loop/HTTP settings.
+"""
+import os
+
+from uvicorn_worker import UvicornWorker
+
+
+class Worker(UvicornWorker):
+    # Pin the fast implementations rather than letting Uvicorn fall back
+    # silently: a missing uvloop/httptools fails at startup instead of
+    # quietly serving from the pure-Python asyncio loop and h11 parser.
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+
+worker_class = "gunicorn_conf.Worker"
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# /kpir is CPU-bound, so the sizing rule is one worker per core, not 2N+1.
+# It defaults to 1 because sessions and the chunk cache live in process
+# memory: a token minted by one worker is unknown to the others, and an
+# upload or delete only reloads the worker that handled it.  Within one
+# worker the PIR kernel already runs outside the GIL on the thread pool.
+# Set WEB_CONCURRENCY to the core count once that state is shared.
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))